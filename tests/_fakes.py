@@ -0,0 +1,19 @@
+# tests/_fakes.py
+"""Plain structs for test data — cheaper than MagicMock attribute walks."""
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class FakePosition:
+    """Shape of an mt5 position tuple, as consumed by Position.from_mt5."""
+    ticket: int
+    symbol: str
+    type: int  # 0=buy, 1=sell
+    volume: float
+    price_open: float
+    price_current: float
+    sl: float
+    tp: float
+    profit: float
+    swap: float
+    comment: str = ""
@@ -1,28 +1,75 @@
 # tests/conftest.py
-import pytest
-from unittest.mock import Mock, MagicMock
+import sys
+from unittest.mock import MagicMock
+
 import numpy as np
+import pytest
+
+# Install the MT5 stand-in once, before any trading_algos import — cheaper than
+# re-patching per test and it satisfies the hard `import MetaTrader5` in
+# core/position.py and trailing/base.py on Mac/Linux.
+mock_mt5 = MagicMock()
+mock_mt5.TIMEFRAME_M5 = 5
+mock_mt5.TIMEFRAME_M1 = 1
+mock_mt5.ORDER_TYPE_BUY = 0
+mock_mt5.ORDER_TYPE_SELL = 1
+sys.modules.setdefault("MetaTrader5", mock_mt5)
+
+import trading_algos.core.broker as broker  # noqa: E402
+import trading_algos.trailing.volume_atr as volume_atr  # noqa: E402
+
+# The suite exercises the Mac/Linux fallback paths, exactly as if the real
+# MetaTrader5 package were missing.
+broker._MT5_AVAILABLE = False
+volume_atr._MT5_AVAILABLE = False
+
+
+# Field layout of mt5.copy_rates_from_pos output
+_RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+    ('close', '<f8'), ('tick_volume', '<i8'), ('spread', '<i4'),
+    ('real_volume', '<i8'),
+])
+
+
+def _build_rates(seed=42, n=60, base=1.1000):
+    """Synthetic M5 bars shaped like mt5.copy_rates_from_pos output."""
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((n, 4))  # one PRNG draw for all four series
+    price = base + np.cumsum(noise[:, 0] * 0.0002)
+    arr = np.empty(n, dtype=_RATES_DTYPE)
+    arr['time'] = np.arange(n, dtype=np.int64) * 300
+    arr['open'] = price * (1 + noise[:, 1] * 0.00005)
+    arr['high'] = price + np.abs(noise[:, 2] * 0.00015)
+    arr['low'] = price - np.abs(noise[:, 3] * 0.00015)
+    arr['close'] = price
+    arr['tick_volume'] = rng.integers(800, 5000, n)
+    arr['spread'] = 0
+    arr['real_volume'] = 0
+    return arr
+
+
+# Built once at import — tests only read it, so no per-test regeneration
+_SAMPLE_RATES = _build_rates()
+
+
+@pytest.fixture
+def sample_rates():
+    return _SAMPLE_RATES
+
+
+@pytest.fixture(scope="session")
+def mt5_mock():
+    """The session-wide MetaTrader5 stand-in, for per-test configuration."""
+    return mock_mt5
+
 
-@pytest.fixture(autouse=True)
-def mock_mt5_and_broker(monkeypatch):
-    # Mock MetaTrader5
-    mock_mt5 = MagicMock()
-    mock_mt5.TIMEFRAME_M5 = 5
-    mock_mt5.TIMEFRAME_M1 = 1
-    monkeypatch.setattr("trading_algos.trailing.volume_atr.mt5", mock_mt5)
-    monkeypatch.setattr("trading_algos.core.broker.mt5", mock_mt5)
-
-    # Mock Broker.get_symbol_info
-    mock_info = Mock()
-    mock_info.point = 0.00001
-    mock_info.digits = 5
-    mock_info.trade_stops_level = 10
-    mock_info.trade_contract_size = 100000
-
-    def get_symbol_info(symbol):
-        return mock_info
-
-    monkeypatch.setattr("trading_algos.core.broker.Broker.get_symbol_info", get_symbol_info)
-
-    # Treat np.float64 as float for assertions
-    monkeypatch.setattr(np, "float64", float)
\ No newline at end of file
+@pytest.fixture(scope="session", autouse=True)
+def symbol_info_stub():
+    """Fixed EURUSD-style symbol metadata for the whole session."""
+    info = broker.SymbolInfo(digits=5, point=0.00001,
+                             trade_contract_size=100000, trade_stops_level=10)
+    original = broker.Broker.get_symbol_info
+    broker.Broker.get_symbol_info = staticmethod(lambda symbol: info)
+    yield info
+    broker.Broker.get_symbol_info = original
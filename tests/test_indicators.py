@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import trading_algos.trailing.volume_atr as volume_atr
+from tests._fakes import FakePosition
+from trading_algos.config import (
+    ATR_PERIOD, BASE_MULTIPLIER, MAX_MULTIPLIER, MIN_MULTIPLIER,
+    VOLUME_LOOKBACK, VOLUME_SENSITIVITY,
+)
+from trading_algos.core.broker import Broker
+from trading_algos.core.position import Position
+from trading_algos.trailing.volume_atr import VolumeATRTrailing
+
+# Expected multipliers for the sweep, computed once as one vectorized clip
+_VOL_RATIOS = [0.1, 0.5, 1.0, 2.0, 5.0]
+_EXPECTED_MULTS = dict(zip(_VOL_RATIOS, np.clip(
+    BASE_MULTIPLIER * np.asarray(_VOL_RATIOS) ** (1 / VOLUME_SENSITIVITY),
+    MIN_MULTIPLIER, MAX_MULTIPLIER).tolist()))
+
+
+@pytest.fixture
+def live_rates(monkeypatch, sample_rates):
+    """Pretend MT5 is available and serving sample_rates."""
+    monkeypatch.setattr(volume_atr, "_MT5_AVAILABLE", True)
+    monkeypatch.setattr(Broker, "robust_copy_rates",
+                        staticmethod(lambda *a, **k: sample_rates))
+    return sample_rates
+
+
+def test_get_volume_ratio(live_rates):
+    engine = VolumeATRTrailing()
+    ratio = engine._get_volume_ratio("EURUSD")
+    vols = live_rates['tick_volume']
+    expected = vols[-1] / vols[-VOLUME_LOOKBACK - 1:-1].mean()
+    assert ratio == pytest.approx(expected, rel=1e-9)
+
+
+def test_get_atr(live_rates):
+    engine = VolumeATRTrailing()
+    atr = engine._get_atr("EURUSD")
+    # Independent NumPy reference: vectorized TR then the Wilder recursion.
+    # The seed excludes the forming (last) bar — its TR is only folded by the
+    # incremental step once the bar closes
+    high, low, close = (live_rates['high'][:-1], live_rates['low'][:-1],
+                        live_rates['close'][:-1])
+    tr = np.maximum.reduce([
+        high[1:] - low[1:],
+        np.abs(high[1:] - close[:-1]),
+        np.abs(low[1:] - close[:-1]),
+    ])
+    expected = tr[:ATR_PERIOD].mean()
+    for t in tr[ATR_PERIOD:]:
+        expected = (expected * (ATR_PERIOD - 1) + t) / ATR_PERIOD
+    assert atr == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize("vol_ratio", _VOL_RATIOS)
+def test_multiplier_scales_with_volume(monkeypatch, vol_ratio):
+    engine = VolumeATRTrailing()
+    atr = 0.0015
+    monkeypatch.setattr(engine, "_get_volume_ratio",
+                        lambda symbol, rates=None: vol_ratio)
+    monkeypatch.setattr(engine, "_get_atr",
+                        lambda symbol, timeframe=None, period=None, rates=None: atr)
+    pos = Position.from_mt5(FakePosition(
+        ticket=1, symbol="EURUSD", type=0, volume=0.1,
+        price_open=1.10000, price_current=1.11000,
+        sl=0.0, tp=0.0, profit=20.0, swap=0.0))
+    new_sl = engine.calculate_next_sl(pos)
+    expected = round(pos.price_current - _EXPECTED_MULTS[vol_ratio] * atr, 5)
+    assert new_sl == pytest.approx(expected, abs=1e-9)
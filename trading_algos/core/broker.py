@@ -1,5 +1,6 @@
 # trading_algos/core/broker.py
 from __future__ import annotations
+import time
 from dataclasses import dataclass
 from typing import Optional
 
@@ -12,28 +13,59 @@ except ImportError:
     mt5 = None  # type: ignore
 
 import numpy as np
-import pandas as pd
 from trading_algos.core.logger import log_event
+from trading_algos.trailing._njit import _atr_loop, _ema_last
 
-@dataclass
+# Hoisted MT5 constants — safe to reference when MT5 is absent
+TIMEFRAME_M5 = mt5.TIMEFRAME_M5 if _MT5_AVAILABLE else 5
+TIMEFRAME_M1 = mt5.TIMEFRAME_M1 if _MT5_AVAILABLE else 1
+ORDER_TYPE_BUY = mt5.ORDER_TYPE_BUY if _MT5_AVAILABLE else 0
+ORDER_TYPE_SELL = mt5.ORDER_TYPE_SELL if _MT5_AVAILABLE else 1
+
+@dataclass(slots=True)
 class SymbolInfo:
     digits: int
     point: float
     trade_contract_size: float
     trade_stops_level: int
 
+# Symbol metadata is near-static; cache with a conservative TTL so broker-side
+# changes (e.g. trade_stops_level) are still eventually picked up
+_SYMBOL_INFO_CACHE: dict[str, tuple[float, SymbolInfo]] = {}
+_SYMBOL_INFO_TTL_SEC = 3600.0
+
+# Per-bar analytics caches: (symbol, timeframe, ...) -> (last_bar_epoch, value)
+_ATR_CACHE: dict[tuple, tuple[int, float]] = {}
+_TREND_CACHE: dict[tuple, tuple[int, str]] = {}
+_RATES_CACHE: dict[tuple, tuple[int, np.ndarray]] = {}
+_RATES_FETCH_MIN = 31  # slow-EMA window — one fetch serves ATR and trend
+
 class Broker:
     @staticmethod
     def get_symbol_info(symbol: str) -> SymbolInfo:
+        cached = _SYMBOL_INFO_CACHE.get(symbol)
+        if cached is not None and time.monotonic() - cached[0] < _SYMBOL_INFO_TTL_SEC:
+            return cached[1]
         if not _MT5_AVAILABLE:
-            return SymbolInfo(digits=5, point=0.00001, trade_contract_size=100000, trade_stops_level=10)
-        info = mt5.symbol_info(symbol)
-        return SymbolInfo(
-            digits=info.digits,
-            point=info.point,
-            trade_contract_size=info.trade_contract_size,
-            trade_stops_level=info.trade_stops_level,
-        )
+            info = SymbolInfo(digits=5, point=0.00001, trade_contract_size=100000, trade_stops_level=10)
+        else:
+            raw = mt5.symbol_info(symbol)
+            info = SymbolInfo(
+                digits=raw.digits,
+                point=raw.point,
+                trade_contract_size=raw.trade_contract_size,
+                trade_stops_level=raw.trade_stops_level,
+            )
+        _SYMBOL_INFO_CACHE[symbol] = (time.monotonic(), info)
+        return info
+
+    @staticmethod
+    def invalidate_symbol_info(symbol: Optional[str] = None) -> None:
+        """Drop cached symbol metadata (e.g. after a reconnect/session reset)."""
+        if symbol is None:
+            _SYMBOL_INFO_CACHE.clear()
+        else:
+            _SYMBOL_INFO_CACHE.pop(symbol, None)
 
     @staticmethod
     def modify_sl(position_ticket: int, symbol: str, sl: float, tp: float, digits: int, comment: str = "") -> bool:
@@ -76,6 +108,7 @@ class Broker:
                 log_event("RETRY_FAILED")
                 raise RuntimeError("Failed to fetch positions after retry.")
             log_event("CONNECTION_RESTORED")
+            Broker.invalidate_symbol_info()  # metadata may differ after reinit
         return positions or ()
 
     @staticmethod
@@ -92,14 +125,15 @@ class Broker:
                 log_event("RETRY_FAILED")
                 raise RuntimeError("Failed to fetch rates after retry.")
             log_event("CONNECTION_RESTORED")
+            Broker.invalidate_symbol_info()  # metadata may differ after reinit
         return rates
 
     @staticmethod
     def robust_order_calc_profit(action: int, symbol: str, volume: float, price_open: float, price_close: float) -> float:
         if not _MT5_AVAILABLE:
-            # Fallback assuming USD account
+            # Fallback assuming USD account; branchless sign (buy=0 -> +1, sell=1 -> -1)
             info = Broker.get_symbol_info(symbol)
-            diff = (price_close - price_open) if action == mt5.ORDER_TYPE_BUY else (price_open - price_close)
+            diff = (1 - 2 * action) * (price_close - price_open)
             return diff * volume * info.trade_contract_size
 
         def fetch():
@@ -117,6 +151,7 @@ class Broker:
                 log_event("RETRY_FAILED")
                 raise RuntimeError("Failed to calc profit after retry.")
             log_event("CONNECTION_RESTORED")
+            Broker.invalidate_symbol_info()  # metadata may differ after reinit
         return profit or 0.0
 
     @staticmethod
@@ -141,41 +176,83 @@ class Broker:
                 log_event("RETRY_FAILED")
                 raise RuntimeError("Failed to calc margin after retry.")
             log_event("CONNECTION_RESTORED")
+            Broker.invalidate_symbol_info()  # metadata may differ after reinit
         return margin or 0.0
 
     @staticmethod
-    def _get_atr(symbol: str, timeframe: int = mt5.TIMEFRAME_M5, period: int = 14) -> float:
+    def _latest_bar_time(symbol: str, timeframe: int) -> Optional[int]:
+        latest = Broker.robust_copy_rates(symbol, timeframe, 0, 1)
+        if latest is None or len(latest) == 0:
+            return None
+        return int(latest['time'][0])
+
+    @staticmethod
+    def get_rates_cached(symbol: str, timeframe: int, count: int,
+                         bar_time: Optional[int] = None) -> Optional[np.ndarray]:
+        """Bar-keyed rates fetch shared between indicators.
+
+        Fetches at least _RATES_FETCH_MIN bars so that ATR and trend, when both
+        recomputing on the same new bar, serve from one copy_rates round-trip.
+        """
+        if bar_time is None:
+            bar_time = Broker._latest_bar_time(symbol, timeframe)
+        key = (symbol, timeframe)
+        cached = _RATES_CACHE.get(key)
+        if bar_time is not None and cached is not None and cached[0] == bar_time and len(cached[1]) >= count:
+            return cached[1][-count:]
+        rates = Broker.robust_copy_rates(symbol, timeframe, 0, max(count, _RATES_FETCH_MIN))
+        if rates is None:
+            return None
+        if bar_time is not None:
+            _RATES_CACHE[key] = (bar_time, rates)
+        return rates[-count:] if len(rates) >= count else rates
+
+    @staticmethod
+    def _get_atr(symbol: str, timeframe: int = TIMEFRAME_M5, period: int = 14) -> float:
         if not _MT5_AVAILABLE:
             return 1.0  # Mock
-        rates = Broker.robust_copy_rates(symbol, timeframe, 0, period + 1)
+        # Per-bar cache: the value only changes when a new bar opens
+        bar_time = Broker._latest_bar_time(symbol, timeframe)
+        key = (symbol, timeframe, period)
+        cached = _ATR_CACHE.get(key)
+        if bar_time is not None and cached is not None and cached[0] == bar_time:
+            return cached[1]
+        rates = Broker.get_rates_cached(symbol, timeframe, period + 1, bar_time=bar_time)
         if rates is None or len(rates) < period + 1:
             return 0.0
-        df = pd.DataFrame(rates)
-        tr = pd.concat([
-            df['high'] - df['low'],
-            (df['high'] - df['close'].shift()).abs(),
-            (df['low'] - df['close'].shift()).abs()
-        ], axis=1).max(axis=1)
-        return tr.rolling(period).mean().iloc[-1]
+        # Jitted TR + Wilder pass straight on the structured-array views
+        atr = float(_atr_loop(rates['high'], rates['low'], rates['close'], period))
+        if bar_time is not None:
+            _ATR_CACHE[key] = (bar_time, atr)
+        return atr
 
     @staticmethod
     def get_trend(symbol: str) -> str:
         if not _MT5_AVAILABLE:
             return "neutral"
-        timeframe = mt5.TIMEFRAME_M5
+        timeframe = TIMEFRAME_M5
         fast_period = 10
         slow_period = 30
-        rates = Broker.robust_copy_rates(symbol, timeframe, 0, slow_period + 1)
+        bar_time = Broker._latest_bar_time(symbol, timeframe)
+        key = (symbol, timeframe)
+        cached = _TREND_CACHE.get(key)
+        if bar_time is not None and cached is not None and cached[0] == bar_time:
+            return cached[1]
+        rates = Broker.get_rates_cached(symbol, timeframe, slow_period + 1, bar_time=bar_time)
         if rates is None or len(rates) < slow_period + 1:
             log_event("RATES_FETCH_FAIL", symbol=symbol)
             return "neutral"
-        df = pd.DataFrame(rates)
-        fast_ema = df['close'].ewm(span=fast_period, adjust=False).mean().iloc[-1]
-        slow_ema = df['close'].ewm(span=slow_period, adjust=False).mean().iloc[-1]
+        closes = rates['close']
+        fast_ema = _ema_last(closes, fast_period)
+        slow_ema = _ema_last(closes, slow_period)
         atr = Broker._get_atr(symbol)
         if abs(fast_ema - slow_ema) < 0.1 * atr:
-            return "neutral"
-        return "buy" if fast_ema > slow_ema else "sell"
+            trend = "neutral"
+        else:
+            trend = "buy" if fast_ema > slow_ema else "sell"
+        if bar_time is not None:
+            _TREND_CACHE[key] = (bar_time, trend)
+        return trend
 
     @staticmethod
     def open_market_position(symbol: str, action: int, volume: float, sl: float = 0.0, tp: float = 0.0, deviation: int = 20, comment: str = "auto_reopen") -> int:
@@ -1,23 +1,44 @@
 # trading_algos/core/logger.py
+import atexit
 import logging
 import json
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any, Dict
 
+# orjson serializes (incl. datetimes) in C — optional, stdlib json fallback
+try:
+    import orjson
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    _ORJSON_AVAILABLE = False
+
 logger = logging.getLogger("trail_engine")
 if not logger.handlers:
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter("%(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    # Hot loop only enqueues; a background listener owns the actual stream
+    # writes so a stalled stderr can't block trailing
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(_log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+    logger.addHandler(QueueHandler(_log_queue))
     logger.setLevel(logging.INFO)
     logger.propagate = False  # Kill dupe to root—unified JSON only
 
 def log_event(event: str, **kwargs: Any) -> None:
     """Structured log in JSON lines (easy to grep/parse later)"""
     payload = {
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": datetime.utcnow(),
         "event": event,
         **kwargs
     }
-    logger.info(json.dumps(payload, default=str))
\ No newline at end of file
+    if _ORJSON_AVAILABLE:
+        line = orjson.dumps(payload, default=str,
+                            option=orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC).decode()
+    else:
+        payload["timestamp"] = payload["timestamp"].isoformat() + "Z"
+        line = json.dumps(payload, default=str)
+    logger.info(line)
@@ -2,11 +2,10 @@
 from dataclasses import dataclass
 from typing import Any
 
-from trading_algos.core.broker import Broker
+from trading_algos.core.broker import Broker, ORDER_TYPE_BUY, ORDER_TYPE_SELL
 from trading_algos.config import COMMISSION_PER_LOT
-import MetaTrader5 as mt5
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     ticket: int
     symbol: str
@@ -42,6 +41,6 @@ class Position:
 
     def profit_if_sl_hit(self, sl_price: float) -> float:
         if sl_price == 0: return 0.0
-        action = mt5.ORDER_TYPE_BUY if self.is_buy else mt5.ORDER_TYPE_SELL
+        action = ORDER_TYPE_BUY if self.is_buy else ORDER_TYPE_SELL
         raw_profit = Broker.robust_order_calc_profit(action, self.symbol, self.volume, self.price_open, sl_price)
         return raw_profit + self.swap - (COMMISSION_PER_LOT * self.volume)
\ No newline at end of file
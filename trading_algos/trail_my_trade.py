@@ -1,6 +1,8 @@
+import random
 import sys
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import MetaTrader5 as mt5
 from argparse import ArgumentParser
 
@@ -13,6 +15,23 @@ from trading_algos.trailing.volume_atr import VolumeATRTrailing
 AVAILABLE_ENGINES = {
     "volume_atr": VolumeATRTrailing,
 }
+ENGINE_ITEMS = tuple(AVAILABLE_ENGINES.items())  # stable order, indexed prompts
+_TYPE_NAMES = ("BUY", "SELL")
+
+def filter_positions(positions, magic=None, needle=None):
+    """Pure filter over an already-fetched batch; needle must be casefolded."""
+    if not magic and not needle:
+        return list(positions)
+    # Single pass: one attribute scan instead of one list (and one set of
+    # LOAD_ATTRs) per active filter
+    out = []
+    for p in positions:
+        if magic and p.magic != magic:
+            continue
+        if needle and needle not in getattr(p, 'comment', '').casefold():
+            continue
+        out.append(p)
+    return out
 
 def get_filtered_positions(symbol=None, ticket=None, magic=None, comment=None):
     """Fetch and filter open positions based on args, using robust fetch."""
@@ -22,22 +41,20 @@ def get_filtered_positions(symbol=None, ticket=None, magic=None, comment=None):
         positions = Broker.robust_positions_get(symbol=symbol)
     if not positions:
         return []
-
-    filtered = list(positions)
-    if magic:
-        filtered = [p for p in filtered if p.magic == magic]
-    if comment:
-        filtered = [p for p in filtered if comment.lower() in getattr(p, 'comment', '').lower()]
-    return filtered
+    return filter_positions(positions, magic, comment.casefold() if comment else None)
 
 def select_engine():
-    print("\nAVAILABLE ENGINES:")
-    for i, name in enumerate(AVAILABLE_ENGINES, 1):
-        print(f" {i}. {name}")
+    # Menu text built once, not per failed input
+    menu = "\nAVAILABLE ENGINES:\n" + "\n".join(
+        f" {i}. {name}" for i, (name, _) in enumerate(ENGINE_ITEMS, 1))
+    print(menu)
+    prompt = f"\nSelect engine (1-{len(ENGINE_ITEMS)}) [default: volume_atr]: "
     while True:
-        c = input(f"\nSelect engine (1-{len(AVAILABLE_ENGINES)}) [default: volume_atr]: ").strip()
-        if not c or c == "1":
+        c = input(prompt).strip()
+        if not c:
             return VolumeATRTrailing()
+        if c.isdigit() and 1 <= int(c) <= len(ENGINE_ITEMS):
+            return ENGINE_ITEMS[int(c) - 1][1]()
         if c in AVAILABLE_ENGINES:
             return AVAILABLE_ENGINES[c]()
         print("Invalid — try again")
@@ -48,11 +65,13 @@ def select_position():
         print("No open positions.")
         mt5.shutdown()
         sys.exit(0)
-    print("\nOPEN POSITIONS:")
+    # One joined write instead of a print syscall per position
+    rows = []
     for i, p in enumerate(positions, 1):
-        t = "BUY" if p.type == 0 else "SELL"
-        sl = f"{p.sl:.5f}" if p.sl else "None"
-        print(f"{i:2}. #{p.ticket} | {p.symbol:8} | {t:4} | {p.volume:4} lots | P/L ${p.profit:+8.2f} | SL {sl} | Comment: {getattr(p, 'comment', 'N/A')}")
+        t = _TYPE_NAMES[p.type]
+        sl = f"{p.sl:.5f}" if p.sl != 0.0 else "None"
+        rows.append(f"{i:2}. #{p.ticket} | {p.symbol:8} | {t:4} | {p.volume:4} lots | P/L ${p.profit:+8.2f} | SL {sl} | Comment: {getattr(p, 'comment', 'N/A')}")
+    print("\nOPEN POSITIONS:\n" + "\n".join(rows))
     while True:
         c = input("\nEnter number or ticket: ").strip().lower()  # Removed 'all' option
         if c.isdigit():
@@ -68,22 +87,21 @@ def select_position():
 def is_auto_trigger(p):
     """Check if position TP is the auto sentinel (direction-specific)."""
     if p.type == 0:  # Buy
-        tp_int_str = str(int(p.tp))
-        return tp_int_str == '888888'
+        return int(p.tp) == 888888
     else:  # Sell
         return abs(p.tp - 0.08) < 1e-6
 
-def trigger_auto(ticket, symbol, sl, digits):
-    """Modify TP to 0.0 and refetch updated position."""
-    success = Broker.modify_sl(ticket, symbol, sl, 0.0, digits)
+def trigger_auto(p, digits):
+    """Clear the sentinel TP, patching the in-hand record instead of refetching.
+
+    The only field the modify changes is tp, so a _replace on the named tuple
+    we already hold gives the same view the old per-ticket refetch returned.
+    """
+    success = Broker.modify_sl(p.ticket, p.symbol, p.sl, 0.0, digits)
     if not success:
-        log_event("MODIFY_FAILED", ticket=ticket)
-        return False, None
-    cur_pos_data = Broker.robust_positions_get(ticket=ticket)
-    if not cur_pos_data:
-        log_event("REFETCH_FAILED", ticket=ticket)
+        log_event("MODIFY_FAILED", ticket=p.ticket)
         return False, None
-    return True, cur_pos_data[0]
+    return True, p._replace(tp=0.0)
 
 def main():
     if not mt5.initialize():
@@ -98,11 +116,19 @@ def main():
     parser.add_argument("--comment", type=str, help="Filter by comment substring (e.g., 'python')")
     parser.add_argument("--all", action="store_true", help="Run forever, trailing all (new/old) matching positions")
     parser.add_argument("--ignore-tp-positions", action="store_true", help="Ignore positions with take profit set (skip trailing, no SL touch)")
+    parser.add_argument("--engine", choices=tuple(AVAILABLE_ENGINES), help="Engine name (skips the interactive prompt; for headless runs)")
     args = parser.parse_args()
 
-    engine = select_engine() if not (args.ticket or args.symbol or args.all) else VolumeATRTrailing()  # Default for CLI
+    # Prompt only when interactive and nothing on the CLI pins the engine
+    if args.engine:
+        engine = AVAILABLE_ENGINES[args.engine]()
+    elif args.ticket or args.symbol or args.all or not sys.stdin.isatty():
+        engine = VolumeATRTrailing()  # Default for CLI / headless
+    else:
+        engine = select_engine()
 
     active_tickets = set()
+    tracked_tickets = set()  # superset: also holds skip-removed tickets still open, so closure cleanup reaches them
     auto_chains = {}  # key: (symbol, direction), value: {'tickets': [], 'target': None, 'last_sl': 0.0, 'volume': float, 'symbol': str, 'direction': str}
     chained_positions = set()  # tickets for chained adds, to exempt from ignore
 
@@ -114,6 +140,11 @@ def main():
                 mt5.shutdown()
                 sys.exit(0)
         else:
+            if not sys.stdin.isatty():
+                # Headless (systemd/Docker): nothing to prompt against
+                print("No filters given and stdin is not a TTY — pass a symbol, --ticket or --all.")
+                mt5.shutdown()
+                sys.exit(1)
             positions = select_position()
         # Filter out TP positions if flag set
         if args.ignore_tp_positions:
@@ -124,6 +155,7 @@ def main():
             pos_obj = Position.from_mt5(pos)
             engine.trail(pos_obj)
             active_tickets.add(pos.ticket)
+            tracked_tickets.add(pos.ticket)
             log_event("START_TRAILING", ticket=pos.ticket)
     else:
         # --all mode: No initial positions, full dynamic scan every loop
@@ -133,25 +165,71 @@ def main():
         if args.magic: log_event("FILTER_SET", filter_type="magic", value=args.magic)
         if args.comment: log_event("FILTER_SET", filter_type="comment", value=args.comment)
 
-    last_sleep_log = time.time()  # Throttle sleeping log
-    last_skip_log = {}  # Per-ticket throttle for skipped logs
+    last_sleep_log = time.monotonic()  # Throttle sleeping log
+    last_skip_log = {}  # Per-ticket throttle for skipped logs (purged below)
+    last_tick_msc = {}  # Per-ticket last seen tick time (skip no-op polls)
+    last_seen = {}  # Per-ticket (bid, ask, sl, tp, swap) — skip provable no-ops
+    next_deadline = time.monotonic() + CHECK_INTERVAL_SEC
+    idle_rounds = 0  # Consecutive empty passes (drives the idle backoff)
+    quiet_rounds = 0  # Consecutive passes where every ticket was gated out
+    comment_needle = args.comment.casefold() if args.comment else None  # folded once
+    # argparse flags read every pass, hoisted out of the loop
+    run_all = args.all
+    symbol_filter = args.symbol
+    magic_filter = args.magic
+    ignore_tp = args.ignore_tp_positions
+
+    def _skip_tp(p, ticket):
+        """Shared skip test: TP set, flag on, and not exempt as a chained add."""
+        return ignore_tp and p.tp != 0.0 and ticket not in chained_positions
+
+    # Event gate for membership scans: positions only open/close when a deal
+    # lands, so track the deal count and skip the full scan while it's flat
+    deals_since = datetime.now() - timedelta(days=1)
+    last_deal_count = None
+    pos_prefetch = None  # next pass's batch, fetched while this pass sleeps
+    # Read-only RPCs (ticks) fan out on this pool; order-mutating calls
+    # (modify_sl / open_market_position) stay serialized on the main thread
+    rpc_pool = ThreadPoolExecutor(max_workers=8)
+    # Hot-loop mt5 entry points bound to locals (LOAD_FAST vs LOAD_ATTR)
+    _history_deals_total = mt5.history_deals_total
+    _symbol_info_tick = mt5.symbol_info_tick
+    _account_info = mt5.account_info
     try:
         while True:
-            current_positions = get_filtered_positions(args.symbol, None, args.magic, args.comment)
-            current_tickets = {p.ticket for p in current_positions}
+            now = time.monotonic()  # one clock read per pass; immune to wall-clock skew
+            deal_count = _history_deals_total(deals_since, datetime.now() + timedelta(days=1))
+            deals_changed = deal_count is None or deal_count != last_deal_count
+            last_deal_count = deal_count
+
+            # One positions_get per tick; everything below indexes this batch.
+            # Always a fresh fetch — the pre-loop startup snapshot predates the
+            # initial engine.trail calls, so its SL fields are already stale
+            new_tickets = set()
+            if pos_prefetch is not None:
+                all_positions = pos_prefetch.result()
+                pos_prefetch = None
+            else:
+                all_positions = Broker.robust_positions_get(symbol=symbol_filter)
+            pos_by_ticket = {p.ticket: p for p in all_positions}
+            # TP edits are order modifications and land no deal, and a
+            # skip-removed ticket can only re-enter via this scan — so the
+            # deal gate is only sound for the pure open/close case
+            if deals_changed or ignore_tp:
+                current_positions = filter_positions(all_positions, magic_filter, comment_needle)
+                new_tickets = {p.ticket for p in current_positions} - active_tickets
 
             # Add new positions
-            new_tickets = current_tickets - active_tickets
+            engine.begin_pass()  # reset the engine's pass-scoped rate memo
+            pass_activity = bool(new_tickets)  # anything got past the gates?
             for new_ticket in new_tickets:
-                new_pos_data = Broker.robust_positions_get(ticket=new_ticket)
-                if new_pos_data:
-                    new_p = new_pos_data[0]
-                    info = Broker.get_symbol_info(new_p.symbol)
-                    digits = info.digits
+                new_p = pos_by_ticket.get(new_ticket)
+                if new_p is not None:
+                    digits = Broker.get_symbol_info(new_p.symbol).digits
                     # Auto trigger check
                     target = None
                     if is_auto_trigger(new_p):
-                        success, updated_p = trigger_auto(new_ticket, new_p.symbol, new_p.sl, digits)
+                        success, updated_p = trigger_auto(new_p, digits)
                         if success:
                             new_p = updated_p
                             log_event("AUTO_TRIGGER_DETECTED", ticket=new_ticket, mode="unlimited", target=target)
@@ -166,46 +244,78 @@ def main():
                             }
                             log_event("CHAIN_STARTED", key=key, anchor=new_ticket)
                     # Now check ignore with possibly updated tp (exempt if auto or chained)
-                    if args.ignore_tp_positions and new_p.tp != 0.0 and new_ticket not in chained_positions:
-                        if new_ticket not in last_skip_log or time.time() - last_skip_log[new_ticket] > 60:
+                    if _skip_tp(new_p, new_ticket):
+                        if new_ticket not in last_skip_log or now - last_skip_log[new_ticket] > 60:
                             log_event("SKIPPED_TP_POSITION", ticket=new_ticket, tp_value=new_p.tp)
-                            last_skip_log[new_ticket] = time.time()
+                            last_skip_log[new_ticket] = now
                         continue
                     new_pos_obj = Position.from_mt5(new_p)
                     engine.trail(new_pos_obj)
                     active_tickets.add(new_ticket)
+                    tracked_tickets.add(new_ticket)
                     log_event("START_TRAILING", ticket=new_ticket)
 
+            # Closures fall out of the batch — one set difference, zero RPCs.
+            # Diffed against tracked_tickets, not active_tickets: skip-removed
+            # tickets leave active while still open, and their engine/gate
+            # state must still be purged when they eventually close
+            for ticket in tracked_tickets - pos_by_ticket.keys():
+                log_event("POSITION_CLOSED", ticket=ticket)
+                chained_positions.discard(ticket)
+                active_tickets.discard(ticket)
+                tracked_tickets.discard(ticket)
+                last_tick_msc.pop(ticket, None)
+                last_skip_log.pop(ticket, None)
+                last_seen.pop(ticket, None)
+                engine.forget(ticket)
+                # Clean from chains
+                for key, chain_data in list(auto_chains.items()):
+                    if ticket in chain_data['tickets']:
+                        chain_data['tickets'].remove(ticket)
+                        if chain_data['tickets']:
+                            new_anchor = chain_data['tickets'][-1]
+                            # New anchor's SL from the already-fetched batch
+                            anchor_p = pos_by_ticket.get(new_anchor)
+                            chain_data['last_sl'] = anchor_p.sl if anchor_p is not None else 0.0
+                            log_event("PROMOTE_PREVIOUS_ANCHOR", key=key, new_anchor=new_anchor)
+                        else:
+                            del auto_chains[key]
+                            log_event("CHAIN_ENDED", key=key)
+
             # Trail active ones (no verbose logging here)
-            for ticket in list(active_tickets):
-                cur_pos_data = Broker.robust_positions_get(ticket=ticket)
-                if not cur_pos_data:
-                    log_event("POSITION_CLOSED", ticket=ticket)
-                    chained_positions.discard(ticket)
-                    active_tickets.discard(ticket)
-                    # Clean from chains
-                    for key, chain_data in list(auto_chains.items()):
-                        if ticket in chain_data['tickets']:
-                            chain_data['tickets'].remove(ticket)
-                            if chain_data['tickets']:
-                                new_anchor = chain_data['tickets'][-1]
-                                # Fetch current sl of new anchor for last_sl
-                                anchor_data = Broker.robust_positions_get(ticket=new_anchor)
-                                if anchor_data:
-                                    chain_data['last_sl'] = anchor_data[0].sl
-                                else:
-                                    chain_data['last_sl'] = 0.0
-                                log_event("PROMOTE_PREVIOUS_ANCHOR", key=key, new_anchor=new_anchor)
-                            else:
-                                del auto_chains[key]
-                                log_event("CHAIN_ENDED", key=key)
-                    continue
-                p = cur_pos_data[0]
-                info = Broker.get_symbol_info(p.symbol)
-                digits = info.digits
+            # Prefetch this pass's ticks concurrently — one RPC per symbol,
+            # overlapped instead of serialized down the ticket loop
+            symbols = {pos_by_ticket[t].symbol for t in active_tickets}
+            if len(symbols) > 1:
+                tick_cache = dict(zip(symbols, rpc_pool.map(_symbol_info_tick, symbols)))
+            else:
+                tick_cache = {}  # single symbol: the in-loop fetch is already minimal
+            to_remove = []  # applied after the loop — avoids copying the set per pass
+            for ticket in active_tickets:
+                p = pos_by_ticket[ticket]
+                digits = Broker.get_symbol_info(p.symbol).digits
+                tick = tick_cache.get(p.symbol)
+                if tick is None:
+                    tick = _symbol_info_tick(p.symbol)
+                    tick_cache[p.symbol] = tick
+                # Event gate: if no new tick arrived since last poll, price
+                # cannot have moved — skip the trailing work entirely
+                msc = getattr(tick, 'time_msc', None)
+                if msc is not None:
+                    if last_tick_msc.get(ticket) == msc:
+                        continue
+                    last_tick_msc[ticket] = msc
+                # Ticks can arrive without anything the engine cares about
+                # moving — if price and position state match the last pass
+                # exactly, the whole trail/chain block is a no-op
+                if tick is not None:
+                    seen_key = (tick.bid, tick.ask, p.sl, p.tp, p.swap)
+                    if last_seen.get(ticket) == seen_key:
+                        continue
+                    last_seen[ticket] = seen_key
                 # Auto mid-run activation
                 if is_auto_trigger(p):
-                    success, updated_p = trigger_auto(ticket, p.symbol, p.sl, digits)
+                    success, updated_p = trigger_auto(p, digits)
                     if success:
                         p = updated_p
                         log_event("AUTO_TRIGGER_DETECTED_MIDRUN", ticket=ticket, mode="unlimited", target=None)
@@ -220,12 +330,13 @@ def main():
                         }
                         log_event("CHAIN_STARTED", key=key, anchor=ticket)
                 # Mid-run check: If TP added later and flag set, skip trail + drop (exempt chained)
-                if args.ignore_tp_positions and p.tp != 0.0 and ticket not in chained_positions:
-                    if ticket not in last_skip_log or time.time() - last_skip_log[ticket] > 60:
+                if _skip_tp(p, ticket):
+                    if ticket not in last_skip_log or now - last_skip_log[ticket] > 60:
                         log_event("SKIPPED_TP_POSITION", ticket=ticket, tp_value=p.tp)
-                        last_skip_log[ticket] = time.time()
-                    active_tickets.discard(ticket)
+                        last_skip_log[ticket] = now
+                    to_remove.append(ticket)
                     continue
+                pass_activity = True
                 pos_obj = Position.from_mt5(p)
                 engine.trail(pos_obj)
                 # SL set detection for anchors (last in chain)
@@ -252,7 +363,7 @@ def main():
                         if trend_reversed:
                             log_event("TREND_REVERSED_SKIP_OPEN", ticket=ticket)
                             continue
-                        tick = mt5.symbol_info_tick(chain_data['symbol'])
+                        # tick already fetched above; chain symbol == position symbol
                         if tick is None:
                             log_event("TICK_FETCH_FAIL", symbol=chain_data['symbol'])
                             continue
@@ -271,8 +382,11 @@ def main():
                         if room_condition:
                             action = 0 if chain_data['direction'] == 'buy' else 1
                             open_price = tick.ask if action == 0 else tick.bid
+                            # Overlap the two pre-open RPCs: account state
+                            # fetches on the pool while margin calcs here
+                            acc_future = rpc_pool.submit(_account_info)
                             margin_req = Broker.robust_order_calc_margin(action, chain_data['symbol'], chain_data['volume'], open_price)
-                            acc = mt5.account_info()
+                            acc = acc_future.result()
                             if acc is None or acc.margin_free < margin_req:
                                 log_event("INSUFFICIENT_MARGIN_SKIP_OPEN", ticket=ticket, required=margin_req)
                             else:
@@ -284,19 +398,48 @@ def main():
                                     chain_data['tickets'].append(new_ticket)
                                     chain_data['last_sl'] = 0.0  # Reset for new anchor
                                     log_event("AUTO_OPEN_SUCCESS", new_ticket=new_ticket, previous_anchor=ticket)
+            active_tickets.difference_update(to_remove)
+            # Skipped-but-open tickets keep their throttle entry forever
+            # otherwise; sweep expired ones once the dict gets large
+            if len(last_skip_log) > 512:
+                last_skip_log = {t: ts for t, ts in last_skip_log.items() if now - ts <= 60}
 
             if not active_tickets:
-                if not args.all:
+                if not run_all:
                     log_event("NO_ACTIVE_EXITING")
                     break
                 else:
-                    if time.time() - last_sleep_log > 60:
+                    if now - last_sleep_log > 60:
                         log_event("NO_POSITIONS_SLEEPING")
-                        last_sleep_log = time.time()
-            time.sleep(CHECK_INTERVAL_SEC)
+                        last_sleep_log = now
+            # Idle backoff: with no live tickets in --all mode, poll less and
+            # less (capped, jittered so parallel instances don't sync up)
+            if run_all and not active_tickets:
+                idle_rounds += 1
+                interval = min(30.0, CHECK_INTERVAL_SEC * (2 ** idle_rounds))
+                interval += random.uniform(0, 0.1 * interval)
+            else:
+                idle_rounds = 0
+                # Quiet tape: every ticket has been gated out for a while —
+                # halve the poll rate, snapping back on the first real update
+                quiet_rounds = 0 if pass_activity else quiet_rounds + 1
+                interval = 2 * CHECK_INTERVAL_SEC if quiet_rounds >= 5 else CHECK_INTERVAL_SEC
+            # Kick off the next batch fetch now so the RPC round-trip overlaps
+            # the pacing sleep instead of extending the next pass
+            if run_all or active_tickets:
+                pos_prefetch = rpc_pool.submit(Broker.robust_positions_get, symbol=symbol_filter)
+            # Drift-corrected pacing: sleep to the deadline, not a fixed interval
+            now = time.monotonic()
+            if next_deadline > now:
+                time.sleep(next_deadline - now)
+                next_deadline += interval
+            else:
+                # Overran the slot — re-anchor instead of snowballing catch-up
+                next_deadline = time.monotonic() + interval
     except KeyboardInterrupt:
         log_event("USER_STOP")
     finally:
+        rpc_pool.shutdown(wait=False)
         mt5.shutdown()
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+# trading_algos/trailing/_njit.py
+"""Optional Numba JIT support for the hot-path math kernels.
+
+Numba is an optional dependency (``pip install trading_algos[perf]``) — when it
+is missing the kernels fall back to vectorized NumPy, so Mac/Linux dev boxes
+and CI keep working without it.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit — returns the function unchanged."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def wrapper(func):
+            return func
+        return wrapper
+
+
+# Signatures pinned so compilation happens at import (and persists via
+# cache=True) instead of stalling the first trail tick
+@njit("float64(float64[:], float64[:], float64[:], int64)", cache=True, fastmath=True)
+def _atr_loop_jit(high, low, close, period):
+    """True Range + Wilder ATR in a single streaming pass.
+
+    Takes the raw ``high``/``low``/``close`` field views of the MT5 structured
+    array (no DataFrame, no copies) and returns the last ATR value as a float.
+    Seeds with the simple mean of the first `period` TRs, then applies the
+    Wilder recursion: atr = (atr * (period - 1) + tr) / period.
+    """
+    n = high.shape[0]
+    if n <= period:
+        return 0.0
+    atr = 0.0
+    for i in range(1, period + 1):
+        hl = high[i] - low[i]
+        hc = abs(high[i] - close[i - 1])
+        lc = abs(low[i] - close[i - 1])
+        atr += max(hl, hc, lc)
+    atr /= period
+    for i in range(period + 1, n):
+        hl = high[i] - low[i]
+        hc = abs(high[i] - close[i - 1])
+        lc = abs(low[i] - close[i - 1])
+        tr = max(hl, hc, lc)
+        atr = (atr * (period - 1) + tr) / period
+    return atr
+
+
+def _atr_numpy(high, low, close, period):
+    """Vectorized fallback: SIMD TR via np.maximum.reduce, short Wilder tail."""
+    n = high.shape[0]
+    if n <= period:
+        return 0.0
+    tr = np.maximum.reduce([
+        high[1:] - low[1:],
+        np.abs(high[1:] - close[:-1]),
+        np.abs(low[1:] - close[:-1]),
+    ])
+    atr = float(tr[:period].mean())
+    for t in tr[period:]:
+        atr = (atr * (period - 1) + t) / period
+    return atr
+
+
+# Same signature/result either way — callers just use _atr_loop
+_atr_loop = _atr_loop_jit if _NUMBA_AVAILABLE else _atr_numpy
+
+
+@njit("float64(float64[:], int64)", cache=True, fastmath=True)
+def _ema_last(values, span):
+    """Last value of an exponential moving average over a field view.
+
+    Same recursion as pandas ewm(span=..., adjust=False).
+    """
+    alpha = 2.0 / (span + 1.0)
+    ema = float(values[0])
+    for i in range(1, values.shape[0]):
+        ema += alpha * (float(values[i]) - ema)
+    return ema
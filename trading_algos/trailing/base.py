@@ -1,6 +1,11 @@
 # trading_algos/trailing/base.py
 from abc import ABC, abstractmethod
 from trading_algos.core.position import Position
+from trading_algos.core.broker import Broker, ORDER_TYPE_BUY, ORDER_TYPE_SELL
+from trading_algos.config import (
+    BASE_PROFIT_TO_ACTIVATE, COMMISSION_PER_LOT, SL_BUFFER_BASE_POINTS,
+    SL_BUFFER_PER_LOT, THRESHOLD_FACTOR_PER_MARGIN,
+)
 import math  # Added for ceil and sqrt
 
 class TrailingEngine(ABC):
@@ -21,20 +26,22 @@ class BasicTrailingEngine(TrailingEngine):
     def __init__(self):
         self.first_sl_set = set()
 
+    def forget(self, ticket: int) -> None:
+        """Drop per-ticket state once a position closes (long-run hygiene)."""
+        self.first_sl_set.discard(ticket)
+
+    def begin_pass(self) -> None:
+        """Loop hook: called once per poll pass, before any trail() calls."""
+
     def _get_min_dist(self, pos: Position) -> float:
         """Shared helper for dynamic min_dist based on lot size."""
-        from trading_algos.core.broker import Broker
-        from trading_algos.config import SL_BUFFER_BASE_POINTS, SL_BUFFER_PER_LOT
         info = Broker.get_symbol_info(pos.symbol)
         buffer_points = SL_BUFFER_BASE_POINTS + pos.volume * SL_BUFFER_PER_LOT
         return max(info.trade_stops_level, buffer_points) * info.point
 
     def _get_profit_threshold(self, pos: Position) -> float:
         """Shared helper for dynamic profit threshold based on position margin and volatility."""
-        from trading_algos.core.broker import Broker
-        from trading_algos.config import BASE_PROFIT_TO_ACTIVATE, THRESHOLD_FACTOR_PER_MARGIN
-        import MetaTrader5 as mt5
-        action = mt5.ORDER_TYPE_BUY if pos.is_buy else mt5.ORDER_TYPE_SELL
+        action = ORDER_TYPE_BUY if pos.is_buy else ORDER_TYPE_SELL
         position_margin = Broker.robust_order_calc_margin(action, pos.symbol, pos.volume, pos.price_open)
         # Use sqrt for slower growth on larger lots/vol
         return BASE_PROFIT_TO_ACTIVATE + (math.sqrt(position_margin) * THRESHOLD_FACTOR_PER_MARGIN)
@@ -44,12 +51,9 @@ class BasicTrailingEngine(TrailingEngine):
         return pos.profit >= threshold and pos.ticket not in self.first_sl_set
 
     def calculate_initial_sl(self, pos: Position) -> float:
-        from trading_algos.core.broker import Broker
-        from trading_algos.config import COMMISSION_PER_LOT
-        import MetaTrader5 as mt5
         info = Broker.get_symbol_info(pos.symbol)
         target_profit = self._get_profit_threshold(pos)
-        action = mt5.ORDER_TYPE_BUY if pos.is_buy else mt5.ORDER_TYPE_SELL
+        action = ORDER_TYPE_BUY if pos.is_buy else ORDER_TYPE_SELL
 
         # Estimate k from current position (handles account currency conversion)
         raw_current = Broker.robust_order_calc_profit(action, pos.symbol, pos.volume, pos.price_open, pos.price_current)
@@ -80,7 +84,6 @@ class BasicTrailingEngine(TrailingEngine):
         raise NotImplementedError("Override in subclass for specific trailing logic")
 
     def trail(self, pos: Position) -> None:
-        from trading_algos.core.broker import Broker
         info = Broker.get_symbol_info(pos.symbol)
         threshold = self._get_profit_threshold(pos)
 
@@ -98,8 +101,10 @@ class BasicTrailingEngine(TrailingEngine):
         # Trail
         if pos.sl != 0.0:
             new_sl = self.calculate_next_sl(pos)
-            point = info.point / 2  # Halve buffer to 0.5pt for faster gold trails (was full point)
-            should_move = (pos.is_buy and new_sl > pos.sl + point) or \
-                          (not pos.is_buy and new_sl < pos.sl - point)
+            # Integer-points compare: SLs are quantized to the point grid, so
+            # "improved by at least one point" is an exact int comparison
+            new_i = int(round(new_sl / info.point))
+            cur_i = int(round(pos.sl / info.point))
+            should_move = new_i > cur_i if pos.is_buy else new_i < cur_i
             if should_move:
                 Broker.modify_sl(pos.ticket, pos.symbol, new_sl, pos.tp, info.digits)
\ No newline at end of file
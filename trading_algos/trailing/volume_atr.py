@@ -1,10 +1,9 @@
 # trading_algos/trailing/volume_atr.py
 from trading_algos.trailing.base import BasicTrailingEngine
+from trading_algos.trailing._njit import _atr_loop
 from trading_algos.core.position import Position
-from trading_algos.core.broker import Broker
+from trading_algos.core.broker import Broker, TIMEFRAME_M5, TIMEFRAME_M1
 from trading_algos.core.logger import log_event
-import numpy as np
-import pandas as pd
 import time  # Added for throttle
 
 from trading_algos.config import (
@@ -21,57 +20,134 @@ except ImportError:
     _MT5_AVAILABLE = False
     mt5 = None
 
+_INV_VOL_SENS = 1.0 / VOLUME_SENSITIVITY  # per-poll division hoisted to import
+_M1_ATR_PERIOD = max(ATR_PERIOD // 3, 5)
+# Worst-case per-bar Wilder shrink factors — slack for the ratchet pre-check
+_GATE_DECAY_M5 = (ATR_PERIOD - 1) / ATR_PERIOD
+_GATE_DECAY_M1 = (_M1_ATR_PERIOD - 1) / _M1_ATR_PERIOD
+
 class VolumeATRTrailing(BasicTrailingEngine):
     def __init__(self):
         super().__init__()
         self.cleaned_preexisting_sl = set()  # Tickets where we removed someone else's SL
         self.last_profit = {}              # Per-ticket profit velocity tracking
         self.last_monitor_log = {}         # Per-ticket last monitor time (throttle)
+        self._atr_state = {}               # (symbol, timeframe, period) -> [bar_time, prev_close, atr, last_fresh]
+        self._vol_state = {}               # symbol -> [bar_time, avg volume of prior closed bars]
+        self._pass_rates = {}              # (symbol, timeframe) -> tail bars, valid for one pass
+
+    def forget(self, ticket: int) -> None:
+        super().forget(ticket)
+        self.cleaned_preexisting_sl.discard(ticket)
+        self.last_profit.pop(ticket, None)
+        self.last_monitor_log.pop(ticket, None)
+
+    def begin_pass(self) -> None:
+        # Positions sharing a symbol within one pass reuse the same tail fetch
+        self._pass_rates.clear()
 
     # ── Helpers ─────────────────────
-    def _get_volume_ratio(self, symbol: str) -> float:
+    def _recent_rates(self, symbol: str, timeframe):
+        """Latest 3 bars of `timeframe`, fetched at most once per pass."""
+        if not _MT5_AVAILABLE:
+            return None
+        key = (symbol, timeframe)
+        rates = self._pass_rates.get(key)
+        if rates is None:
+            rates = Broker.robust_copy_rates(symbol, timeframe, 0, 3)
+            self._pass_rates[key] = rates
+        return rates
+
+    def _get_volume_ratio(self, symbol: str, rates=None) -> float:
+        """rates, if given, must be the latest M5 bars (tail of >= 2)."""
         if not _MT5_AVAILABLE: return 1.0
-        rates = Broker.robust_copy_rates(symbol, mt5.TIMEFRAME_M5, 0, VOLUME_LOOKBACK + 10)
-        if rates is None or len(rates) < VOLUME_LOOKBACK: return 1.0
-        df = pd.DataFrame(rates)
-        avg = df['tick_volume'].rolling(VOLUME_LOOKBACK).mean().iloc[-2]
-        cur = df['tick_volume'].iloc[-1]
-        return cur / avg if avg > 0 else 1.0
-
-    def _get_atr(self, symbol: str, timeframe=mt5.TIMEFRAME_M5, period=ATR_PERIOD) -> float:
+        # Numerator (current bar's volume) moves every tick, but the
+        # denominator only changes when a bar closes — cache it per bar and
+        # fetch just the tail on the steady-state path
+        if rates is None:
+            rates = Broker.robust_copy_rates(symbol, TIMEFRAME_M5, 0, 2)
+        if rates is None or len(rates) < 2: return 1.0
+        bar_time = int(rates['time'][-1])
+        state = self._vol_state.get(symbol)
+        if state is None or state[0] != bar_time:
+            # Exactly the bars the slice below consumes: LOOKBACK closed + current
+            full = Broker.robust_copy_rates(symbol, TIMEFRAME_M5, 0, VOLUME_LOOKBACK + 1)
+            if full is None or len(full) < VOLUME_LOOKBACK + 1: return 1.0
+            # One slice mean on the structured-array view — no DataFrame round-trip
+            avg = float(full['tick_volume'][-VOLUME_LOOKBACK - 1:-1].mean())
+            self._vol_state[symbol] = state = [bar_time, avg]
+        avg = state[1]
+        return float(rates['tick_volume'][-1]) / avg if avg > 0 else 1.0
+
+    def _get_atr(self, symbol: str, timeframe=TIMEFRAME_M5, period=ATR_PERIOD, rates=None) -> float:
+        """rates, if given, must be the latest bars of `timeframe` (tail of >= 3)."""
         if not _MT5_AVAILABLE:
             info = Broker.get_symbol_info(symbol)
             return info.point * 150
-        rates = Broker.robust_copy_rates(symbol, timeframe, 0, period + 20)
-        if rates is None or len(rates) <= period:
-            info = Broker.get_symbol_info(symbol)
-            return info.point * 150
-        df = pd.DataFrame(rates)
-        tr = pd.concat([
-            df['high'] - df['low'],
-            (df['high'] - df['close'].shift()).abs(),
-            (df['low'] - df['close'].shift()).abs()
-        ], axis=1).max(axis=1)
-        return tr.rolling(period).mean().iloc[-1]
+        key = (symbol, timeframe, period)
+        state = self._atr_state.get(key)
+        if state is None:
+            # Seed Wilder state once from the closed bars only — folding the
+            # forming bar's partial TR here would double-count it when the
+            # first incremental step folds the same bar after it closes
+            rates = Broker.robust_copy_rates(symbol, timeframe, 0, period + 20)
+            if rates is None or len(rates) <= period + 1:
+                info = Broker.get_symbol_info(symbol)
+                return info.point * 150
+            atr = float(_atr_loop(rates['high'][:-1], rates['low'][:-1], rates['close'][:-1], period))
+            self._atr_state[key] = [rates['time'][-1], float(rates['close'][-2]), atr, time.monotonic()]
+            return atr
+        # Incremental path: O(1) per poll, only the last bars are fetched
+        if rates is None:
+            rates = Broker.robust_copy_rates(symbol, timeframe, 0, 3)
+        if rates is None or len(rates) < 3:
+            return state[2]
+        state[3] = time.monotonic()  # verified against a live tail just now
+        last_time, prev_close, atr = state[0], state[1], state[2]
+        if rates['time'][-1] == last_time:
+            return atr  # Still inside the same bar
+        if rates['time'][-2] != last_time:
+            # Missed more than one bar (gap/restart) — reseed from scratch
+            del self._atr_state[key]
+            return self._get_atr(symbol, timeframe, period)
+        # Exactly one bar closed: fold it into the Wilder recursion
+        h, l = float(rates['high'][-2]), float(rates['low'][-2])
+        tr = max(h - l, abs(h - prev_close), abs(l - prev_close))
+        atr = (atr * (period - 1) + tr) / period
+        state[0] = rates['time'][-1]
+        state[1] = float(rates['close'][-2])
+        state[2] = atr
+        return atr
 
     def calculate_next_sl(self, pos: Position) -> float:
         info = Broker.get_symbol_info(pos.symbol)
-        vol_ratio = max(self._get_volume_ratio(pos.symbol), 0.1)
+        # One M5 tail fetch serves both the volume ratio and the M5 ATR step
+        recent_m5 = self._recent_rates(pos.symbol, TIMEFRAME_M5)
+        vol_ratio = max(self._get_volume_ratio(pos.symbol, rates=recent_m5), 0.1)
 
-        mult = np.clip(BASE_MULTIPLIER * (vol_ratio ** (1 / VOLUME_SENSITIVITY)),
-                       MIN_MULTIPLIER, MAX_MULTIPLIER)
+        # Scalar clamp — np.clip's dispatch machinery is overkill for a float
+        mult = BASE_MULTIPLIER * (vol_ratio ** _INV_VOL_SENS)
+        if mult < MIN_MULTIPLIER:
+            mult = MIN_MULTIPLIER
+        elif mult > MAX_MULTIPLIER:
+            mult = MAX_MULTIPLIER
 
         # Optional velocity boost on crazy spikes
-        now = pd.Timestamp.now().timestamp()
-        prev = self.last_profit.get(pos.ticket, (pos.profit, now))
-        velocity = (pos.profit - prev[0]) / max((now - prev[1]) / 60, 0.1)
-        if velocity > 6.0:
-            mult *= max(0.7, 1 - velocity/60)
-        self.last_profit[pos.ticket] = (pos.profit, now)
+        now = time.monotonic()  # wall-clock steps must not fake a velocity
+        state = self.last_profit.get(pos.ticket)
+        if state is None:
+            self.last_profit[pos.ticket] = [pos.profit, now]
+        else:
+            velocity = (pos.profit - state[0]) / max((now - state[1]) / 60, 0.1)
+            if velocity > 6.0:
+                mult *= max(0.7, 1 - velocity/60)
+            state[0] = pos.profit
+            state[1] = now
 
         # Boost M1 weight for gold spikes (0.5 from 0.3)
-        atr = 0.5 * self._get_atr(pos.symbol, mt5.TIMEFRAME_M5) + \
-              0.5 * self._get_atr(pos.symbol, mt5.TIMEFRAME_M1, max(ATR_PERIOD//3, 5))
+        atr = 0.5 * self._get_atr(pos.symbol, TIMEFRAME_M5, rates=recent_m5) + \
+              0.5 * self._get_atr(pos.symbol, TIMEFRAME_M1, _M1_ATR_PERIOD,
+                                  rates=self._recent_rates(pos.symbol, TIMEFRAME_M1))
 
         min_dist = self._get_min_dist(pos)  # Use shared helper
 
@@ -114,18 +190,41 @@ class VolumeATRTrailing(BasicTrailingEngine):
 
         # 3. Once we own the SL → ratchet only, never remove, never move back
         if pos.ticket in self.first_sl_set:
+            # Cheap pre-check before any rate fetch: with the smallest possible
+            # multiplier (incl. the 0.7 velocity floor, plus slack for
+            # bar-roll ATR drops) and the last known ATRs, can the candidate
+            # move the SL by a point at all? The cached ATRs only refresh
+            # inside the very call this gate suppresses, so the slack decays
+            # one worst-case Wilder step per bar of staleness — a stale floor
+            # widens toward letting the real computation run, never toward
+            # pinning the gate shut on frozen state.
+            m5 = self._atr_state.get((pos.symbol, TIMEFRAME_M5, ATR_PERIOD))
+            m1 = self._atr_state.get((pos.symbol, TIMEFRAME_M1, _M1_ATR_PERIOD))
+            if m5 is not None and m1 is not None and pos.sl != 0.0:
+                now = time.monotonic()
+                f5 = m5[2] * _GATE_DECAY_M5 ** (1.0 + (now - m5[3]) / 300.0)
+                f1 = m1[2] * _GATE_DECAY_M1 ** (1.0 + (now - m1[3]) / 60.0)
+                floor_dist = 0.7 * MIN_MULTIPLIER * min(f5, f1)
+                if pos.is_buy:
+                    plausible = pos.price_current - floor_dist > pos.sl + info.point
+                else:
+                    plausible = pos.price_current + floor_dist < pos.sl - info.point
+                if not plausible:
+                    return
             new_sl = self.calculate_next_sl(pos)
-            point = info.point / 2  # Halve buffer to 0.5pt for faster gold trails (was full point)
-            should_move = (pos.is_buy and new_sl > pos.sl + point) or \
-                          (not pos.is_buy and new_sl < pos.sl - point)
+            # Integer-points compare: SLs are quantized to the point grid, so
+            # "improved by at least one point" is an exact int comparison
+            new_i = int(round(new_sl / info.point))
+            cur_i = int(round(pos.sl / info.point))
+            should_move = new_i > cur_i if pos.is_buy else new_i < cur_i
             if should_move:
                 Broker.modify_sl(pos.ticket, pos.symbol, new_sl, pos.tp, info.digits)
                 log_event("SL_TRAILED", ticket=pos.ticket, sl=new_sl, profit=round(pos.profit,2))
             return
 
         # Throttled monitoring if below activation (60s/ticket)
-        if pos.ticket not in self.last_monitor_log or time.time() - self.last_monitor_log[pos.ticket] > 60:
+        if pos.ticket not in self.last_monitor_log or time.monotonic() - self.last_monitor_log[pos.ticket] > 60:
             threshold = self._get_profit_threshold(pos)
             needed_profit = threshold - pos.profit
             log_event("POSITION_MONITOR", ticket=pos.ticket, current_profit=round(pos.profit, 2), needed_profit=round(needed_profit, 2))
-            self.last_monitor_log[pos.ticket] = time.time()
\ No newline at end of file
+            self.last_monitor_log[pos.ticket] = time.monotonic()
\ No newline at end of file